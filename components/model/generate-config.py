@@ -6,29 +6,87 @@ This script reads the LanguageModel spec from a mounted ConfigMap
 and generates a LiteLLM-compatible config.yaml file.
 """
 
-import json
 import os
 import sys
+import orjson
 import yaml
+from collections import ChainMap
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+# Prefer the libyaml-backed emitter; fall back to pure Python if unavailable
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
+# Load-balanced endpoints share one litellm_params dict via ChainMap; flatten on emit
+YamlDumper.add_representer(ChainMap, lambda dumper, data: dumper.represent_dict(dict(data)))
+
+# Last parsed model spec, keyed on (inode, mtime_ns) of the resolved ConfigMap file
+_SPEC_CACHE: Optional[Tuple[Tuple[int, int], Dict[str, Any]]] = None
+
+# Seconds per duration suffix, e.g. "30s", "5m", "1h"
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+# Providers served through LiteLLM's generic OpenAI client
+_OPENAI_COMPATIBLE_PROVIDERS: FrozenSet[str] = frozenset({"openai-compatible", "custom"})
+
+# LiteLLM model name prefix per LanguageModel provider
+_PROVIDER_PREFIXES = {
+    "openai": "",
+    "anthropic": "",
+    "azure": "azure/",
+    "bedrock": "bedrock/",
+    "vertex": "vertex_ai/",
+    "openai-compatible": "openai/",  # Use openai/ for generic OpenAI-compatible endpoints
+    "custom": "",
+}
+
+# LanguageModel load balancing strategy to LiteLLM routing_strategy
+_ROUTING_STRATEGIES = {
+    "round-robin": "simple-shuffle",
+    "least-connections": "least-busy",
+    "random": "simple-shuffle",
+    "weighted": "simple-shuffle",
+    "latency-based": "latency-based-routing",
+}
 
 
 def load_model_spec(config_path: str = "/etc/langop/model.json") -> Dict[str, Any]:
-    """Load the LanguageModel spec from ConfigMap."""
+    """Load the LanguageModel spec from ConfigMap.
+
+    The parsed spec is cached until the file changes. Kubelet updates mounted
+    ConfigMaps by atomically swapping the ..data symlink, which yields a new
+    inode for the resolved file.
+    """
+    global _SPEC_CACHE
     try:
-        with open(config_path, 'r') as f:
-            spec = json.load(f)
+        st = os.stat(config_path)
+        cache_key = (st.st_ino, st.st_mtime_ns)
+        if _SPEC_CACHE is not None and _SPEC_CACHE[0] == cache_key:
+            return _SPEC_CACHE[1]
+
+        with open(config_path, 'rb') as f:
+            spec = orjson.loads(f.read())
+        _SPEC_CACHE = (cache_key, spec)
         print(f"✓ Loaded model spec from {config_path}", file=sys.stderr)
         return spec
     except FileNotFoundError:
         print(f"✗ Model config not found at {config_path}", file=sys.stderr)
         sys.exit(1)
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"✗ Invalid JSON in model config: {e}", file=sys.stderr)
         sys.exit(1)
 
 
+def parse_duration(value: str, default: int = 300) -> int:
+    """Parse a duration like "5m" or "30s" to seconds, or return default."""
+    if value and value[-1] in _DURATION_UNITS:
+        return int(value[:-1]) * _DURATION_UNITS[value[-1]]
+    return default
+
+
 def load_api_key(secret_ref: Optional[Dict[str, str]]) -> Optional[str]:
     """Load API key from mounted secret or environment variable."""
     if not secret_ref:
@@ -40,12 +98,14 @@ def load_api_key(secret_ref: Optional[Dict[str, str]]) -> Optional[str]:
 
     secret_path = f"/etc/secrets/{secret_name}/{secret_key}"
 
-    # Try to load from mounted secret file
-    if os.path.exists(secret_path):
+    # Try to load from mounted secret file (open directly; kubelet may swap the mount underneath us)
+    try:
         with open(secret_path, 'r') as f:
             key = f.read().strip()
         print(f"✓ Loaded API key from secret {secret_name}/{secret_key}", file=sys.stderr)
         return key
+    except FileNotFoundError:
+        pass
 
     # Fallback to environment variable
     env_var = secret_ref.get("name", "").upper().replace("-", "_")
@@ -59,17 +119,7 @@ def load_api_key(secret_ref: Optional[Dict[str, str]]) -> Optional[str]:
 
 def map_provider_to_litellm(provider: str, model_name: str, endpoint: Optional[str] = None) -> str:
     """Map LanguageModel provider to LiteLLM model format."""
-    provider_map = {
-        "openai": model_name,
-        "anthropic": model_name,
-        "azure": f"azure/{model_name}",
-        "bedrock": f"bedrock/{model_name}",
-        "vertex": f"vertex_ai/{model_name}",
-        "openai-compatible": f"openai/{model_name}",  # Use openai/ for generic OpenAI-compatible endpoints
-        "custom": model_name,
-    }
-
-    return provider_map.get(provider, model_name)
+    return f"{_PROVIDER_PREFIXES.get(provider, '')}{model_name}"
 
 
 def build_litellm_params(spec: Dict[str, Any], api_key: Optional[str]) -> Dict[str, Any]:
@@ -79,6 +129,7 @@ def build_litellm_params(spec: Dict[str, Any], api_key: Optional[str]) -> Dict[s
     provider = spec.get("provider")
     model_name = spec.get("modelName")
     endpoint = spec.get("endpoint")
+    is_openai_compatible = provider in _OPENAI_COMPATIBLE_PROVIDERS
 
     # Set the model
     params["model"] = map_provider_to_litellm(provider, model_name, endpoint)
@@ -86,19 +137,19 @@ def build_litellm_params(spec: Dict[str, Any], api_key: Optional[str]) -> Dict[s
     # Set API base/endpoint
     if endpoint:
         # For openai-compatible providers, ensure endpoint ends with /v1
-        if provider in ["openai-compatible", "custom"] and not endpoint.endswith("/v1"):
+        if is_openai_compatible and not endpoint.endswith("/v1"):
             params["api_base"] = f"{endpoint.rstrip('/')}/v1"
         else:
             params["api_base"] = endpoint
 
     # For openai-compatible providers, explicitly set custom_llm_provider to avoid strict validation
-    if provider in ["openai-compatible", "custom"]:
+    if is_openai_compatible:
         params["custom_llm_provider"] = "openai"
 
     # Set API key - use dummy for local/compatible endpoints without auth
     if api_key:
         params["api_key"] = api_key
-    elif provider in ["openai-compatible", "custom"]:
+    elif is_openai_compatible:
         # Local LLM servers (LM Studio, Ollama, etc.) don't need auth but litellm requires the field
         params["api_key"] = "sk-local-dummy-key"
 
@@ -120,17 +171,8 @@ def build_litellm_params(spec: Dict[str, Any], api_key: Optional[str]) -> Dict[s
 
     # Add timeout
     if spec.get("timeout"):
-        # Parse duration like "5m" or "30s" to seconds
-        timeout_str = spec["timeout"]
-        if timeout_str.endswith("m"):
-            timeout = int(timeout_str[:-1]) * 60
-        elif timeout_str.endswith("s"):
-            timeout = int(timeout_str[:-1])
-        elif timeout_str.endswith("h"):
-            timeout = int(timeout_str[:-1]) * 3600
-        else:
-            timeout = 300  # default 5 minutes
-        params["timeout"] = timeout
+        # Parse duration like "5m" or "30s" to seconds (default 5 minutes)
+        params["timeout"] = parse_duration(spec["timeout"])
 
     return params
 
@@ -158,12 +200,10 @@ def build_model_list(spec: Dict[str, Any], api_key: Optional[str]) -> List[Dict[
     if endpoints:
         models = []
         for i, ep in enumerate(endpoints):
-            ep_params = litellm_params.copy()
-            ep_params["api_base"] = ep["url"]
-
+            # Only api_base differs per endpoint, so layer it over the shared params
             ep_entry = {
                 "model_name": model_name,
-                "litellm_params": ep_params,
+                "litellm_params": ChainMap({"api_base": ep["url"]}, litellm_params),
             }
 
             # Add endpoint-specific rate limits or weight
@@ -187,17 +227,7 @@ def build_router_settings(spec: Dict[str, Any]) -> Dict[str, Any]:
     load_balancing = spec.get("loadBalancing", {})
     if load_balancing:
         strategy = load_balancing.get("strategy", "round-robin")
-
-        # Map strategy names
-        strategy_map = {
-            "round-robin": "simple-shuffle",
-            "least-connections": "least-busy",
-            "random": "simple-shuffle",
-            "weighted": "simple-shuffle",
-            "latency-based": "latency-based-routing",
-        }
-
-        settings["routing_strategy"] = strategy_map.get(strategy, "simple-shuffle")
+        settings["routing_strategy"] = _ROUTING_STRATEGIES.get(strategy, "simple-shuffle")
 
     return settings if settings else None
 
@@ -208,7 +238,7 @@ def build_litellm_settings(spec: Dict[str, Any]) -> Dict[str, Any]:
 
     # For openai-compatible providers, disable strict response validation
     provider = spec.get("provider")
-    if provider in ["openai-compatible", "custom"]:
+    if provider in _OPENAI_COMPATIBLE_PROVIDERS:
         # Disable strict validation for non-standard OpenAI-compatible responses
         settings["drop_params"] = True
         settings["disable_strict_validation"] = True
@@ -240,17 +270,7 @@ def build_litellm_settings(spec: Dict[str, Any]) -> Dict[str, Any]:
     if caching and caching.get("enabled"):
         settings["cache"] = True
         if caching.get("ttl"):
-            # Parse TTL duration
-            ttl_str = caching["ttl"]
-            if ttl_str.endswith("m"):
-                ttl = int(ttl_str[:-1]) * 60
-            elif ttl_str.endswith("s"):
-                ttl = int(ttl_str[:-1])
-            elif ttl_str.endswith("h"):
-                ttl = int(ttl_str[:-1]) * 3600
-            else:
-                ttl = 300
-            settings["cache_kwargs"] = {"ttl": ttl}
+            settings["cache_kwargs"] = {"ttl": parse_duration(caching["ttl"])}
 
     # Always return settings dict (even if mostly empty) for openai-compatible providers
     return settings
@@ -301,9 +321,10 @@ def main():
     # Generate LiteLLM config
     litellm_config = generate_litellm_config(spec, api_key)
 
-    # Write config to stdout (can be redirected to file)
-    output = yaml.dump(litellm_config, default_flow_style=False, sort_keys=False)
-    print(output)
+    # Stream config to stdout as UTF-8 bytes (can be redirected to file)
+    yaml.dump(litellm_config, sys.stdout.buffer, Dumper=YamlDumper, encoding="utf-8",
+              default_flow_style=False, sort_keys=False)
+    sys.stdout.buffer.flush()
 
     print("✅ LiteLLM config generated successfully", file=sys.stderr)
     print(f"   Provider: {spec.get('provider')}", file=sys.stderr)